@@ -2,8 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
+import orjson
+import pyarrow as pa
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from api import queries
 from api.models import (
@@ -15,6 +22,17 @@ from api.models import (
     Subpopulation,
 )
 
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
 app = FastAPI(
     title="San Diego Homelessness API",
     description=(
@@ -23,10 +41,29 @@ app = FastAPI(
         "and FY2021-FY2026 for city spending."
     ),
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 
+async def _json(func: Callable[..., Any], *args: Any) -> ORJSONResponse:
+    """Run a query in a worker thread and return its result as-is.
+
+    The query layer already returns plain dicts of JSON types, so the
+    response skips per-row Pydantic validation; the models in api.models
+    only document the response schema.
+    """
+    return ORJSONResponse(await asyncio.to_thread(func, *args))
+
+
+def _ipc_stream(table: pa.Table) -> bytes:
+    """Serialize an Arrow table in the IPC streaming format."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
 @app.get("/health")
 def health():
     """Debug endpoint — shows data path and file availability."""
@@ -42,58 +79,72 @@ def root():
         "message": "San Diego Homelessness API",
         "docs": "/docs",
         "endpoints": [
-            "/filters", "/overview", "/trends", "/subpopulations",
+            "/filters", "/overview", "/trends", "/trends.arrow", "/subpopulations",
             "/geography", "/spending",
         ],
     }
 
 
-@app.get("/filters", response_model=FilterOptions)
-def filters():
+@app.get("/filters", responses={200: {"model": FilterOptions}})
+async def filters():
     """Available years and regions for filtering."""
-    return queries.get_filter_options()
+    return await _json(queries.get_filter_options)
 
 
-@app.get("/overview", response_model=OverviewResponse)
-def overview(
+@app.get("/overview", responses={200: {"model": OverviewResponse}})
+async def overview(
     year: int | None = Query(None, description="PIT count year (default: most recent)"),
 ):
     """Latest PIT count with year-over-year change."""
-    return queries.get_overview(year)
+    return await _json(queries.get_overview, year)
 
 
-@app.get("/trends", response_model=list[PITTrend])
-def trends(
+@app.get("/trends", responses={200: {"model": list[PITTrend]}})
+async def trends(
     year_min: int = Query(2011, description="Start year"),
     year_max: int = Query(2024, description="End year"),
 ):
     """Annual PIT totals over time: total, sheltered, unsheltered."""
-    return queries.get_pit_trends(year_min, year_max)
+    return await _json(queries.get_pit_trends, year_min, year_max)
+
+
+@app.get(
+    "/trends.arrow",
+    response_class=Response,
+    responses={200: {"content": {ARROW_STREAM: {}}}},
+)
+async def trends_arrow(
+    year_min: int = Query(2011, description="Start year"),
+    year_max: int = Query(2024, description="End year"),
+):
+    """Same as /trends, as an Arrow IPC stream for columnar clients."""
+    table = await asyncio.to_thread(queries.get_pit_trends_arrow, year_min, year_max)
+    return Response(_ipc_stream(table), media_type=ARROW_STREAM)
 
 
-@app.get("/subpopulations", response_model=list[Subpopulation])
-def subpopulations(
+@app.get("/subpopulations", responses={200: {"model": list[Subpopulation]}})
+async def subpopulations(
     year_min: int = Query(2011, description="Start year"),
     year_max: int = Query(2024, description="End year"),
     group: str | None = Query(None, description="Filter by group (e.g. 'Veterans', 'Chronically Homeless')"),
 ):
     """Demographic subgroup counts by year."""
-    return queries.get_subpopulations(year_min, year_max, group)
+    return await _json(queries.get_subpopulations, year_min, year_max, group)
 
 
-@app.get("/geography", response_model=list[GeographyCount])
-def geography(
+@app.get("/geography", responses={200: {"model": list[GeographyCount]}})
+async def geography(
     year: int | None = Query(None, description="PIT count year (default: most recent)"),
     region: str | None = Query(None, description="Filter by region (e.g. 'City of San Diego')"),
 ):
     """PIT counts by subregion within San Diego County."""
-    return queries.get_geography(year, region)
+    return await _json(queries.get_geography, year, region)
 
 
-@app.get("/spending", response_model=list[SpendingTrend])
-def spending(
+@app.get("/spending", responses={200: {"model": list[SpendingTrend]}})
+async def spending(
     fy_min: int = Query(2021, description="Start fiscal year"),
     fy_max: int = Query(2026, description="End fiscal year"),
 ):
     """City Homelessness Strategies & Solutions department spending by fiscal year."""
-    return queries.get_spending_trends(fy_min, fy_max)
+    return await _json(queries.get_spending_trends, fy_min, fy_max)
@@ -0,0 +1,41 @@
+"""Bounded pool of DuckDB cursors over a single in-memory database.
+
+A DuckDB connection runs one query at a time, so concurrent API requests
+each check out their own cursor. All cursors share the same database
+(and its parquet metadata cache, so each file's footer is parsed once per
+process). Pool size comes from DUCKDB_POOL_SIZE and the number of DuckDB
+worker threads from DUCKDB_THREADS (default: all CPUs).
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import duckdb
+
+POOL_SIZE = int(os.environ.get("DUCKDB_POOL_SIZE", "4"))
+THREADS = int(os.environ.get("DUCKDB_THREADS", os.cpu_count() or 1))
+
+_CON = duckdb.connect(":memory:")
+# enable_object_cache is a no-op in current DuckDB; this is the setting
+# that keeps parsed parquet footers around between queries. GLOBAL so the
+# pooled cursors (separate sessions) inherit it.
+_CON.execute("SET GLOBAL parquet_metadata_cache = true")
+_CON.execute(f"SET GLOBAL threads = {THREADS}")
+
+_POOL: queue.Queue[duckdb.DuckDBPyConnection] = queue.Queue(maxsize=POOL_SIZE)
+for _ in range(POOL_SIZE):
+    _POOL.put(_CON.cursor())
+
+
+@contextmanager
+def get_cursor() -> Iterator[duckdb.DuckDBPyConnection]:
+    """Check out a cursor, blocking until one is free, and return it afterwards."""
+    cur = _POOL.get()
+    try:
+        yield cur
+    finally:
+        _POOL.put(cur)
@@ -1,72 +1,149 @@
 """Shared query layer — all SQL lives here.
 
 Both the FastAPI endpoints and MCP tools call these functions.
-Each function creates a fresh DuckDB connection, queries parquet files,
-and returns list[dict] (or dict for single-row responses).
+Each aggregated parquet is copied into an in-memory DuckDB table on first
+use and reloaded whenever the file's mtime changes, so requests never read
+parquet. Queries run on cursors checked out from the shared pool in
+api/pool.py and return list[dict] (or dict for single-row responses).
+Rows are built from Arrow tables with to_pylist(), skipping pandas. Results
+that only depend on the data are cached as Arrow tables until the next reload.
 """
 
 from __future__ import annotations
 
+import os
+import threading
+from functools import lru_cache
 from pathlib import Path
 
 import duckdb
+import pyarrow as pa
+
+from api.pool import get_cursor
 
 # Resolve parquet directory relative to repo root
 _ROOT = Path(__file__).resolve().parent.parent
 _AGG = str(_ROOT / "data" / "aggregated")
 
+# Fixed query templates against the in-memory tables — values are always
+# bound as parameters, never formatted into the SQL string.
+_YEARS_SQL = "SELECT DISTINCT year FROM pit_trends WHERE year IS NOT NULL ORDER BY year"
+_REGIONS_SQL = (
+    "SELECT DISTINCT region FROM pit_geography WHERE region IS NOT NULL ORDER BY region"
+)
+# Requested year (default: latest) and the year before it, in one scan
+_OVERVIEW_SQL = (
+    "WITH target AS (SELECT COALESCE($year, MAX(year)) AS year FROM pit_trends) "
+    "SELECT p.year, p.total, p.sheltered, p.unsheltered "
+    "FROM pit_trends p, target t "
+    "WHERE p.year IN (t.year, t.year - 1) "
+    "ORDER BY p.year DESC"
+)
+_PIT_TRENDS_SQL = (
+    "SELECT year, total, sheltered, unsheltered FROM pit_trends "
+    "WHERE year BETWEEN $year_min AND $year_max "
+    "ORDER BY year"
+)
+_SUBPOPULATIONS_SQL = (
+    "SELECT year, group_name, count FROM pit_subpopulations "
+    "WHERE year BETWEEN $year_min AND $year_max "
+    "AND ($group IS NULL OR group_name = $group) "
+    "ORDER BY year, group_name"
+)
+_GEOGRAPHY_SQL = (
+    "SELECT year, region, total, sheltered, unsheltered FROM pit_geography "
+    "WHERE year = COALESCE($year, (SELECT MAX(year) FROM pit_geography)) "
+    "AND ($region IS NULL OR region = $region) "
+    "ORDER BY total DESC"
+)
+_SPENDING_SQL = (
+    "SELECT fiscal_year, amount FROM homelessness_spending "
+    "WHERE fiscal_year BETWEEN $fy_min AND $fy_max "
+    "ORDER BY fiscal_year"
+)
+
+# Columns copied from each aggregated parquet into its in-memory table
+_COLUMNS = {
+    "pit_trends": "year, total, sheltered, unsheltered",
+    "pit_subpopulations": "year, group_name, count",
+    "pit_geography": "year, region, total, sheltered, unsheltered",
+    "homelessness_spending": "fiscal_year, amount",
+}
+
+# mtime of the parquet each in-memory table was last loaded from
+_loaded: dict[str, int] = {}
+_load_lock = threading.Lock()
+
+
+def _mtime(name: str) -> int:
+    """Modification time of an aggregated parquet, used as a cache key."""
+    try:
+        return os.stat(f"{_AGG}/{name}.parquet").st_mtime_ns
+    except FileNotFoundError:
+        return 0
 
-def _q(where: str, condition: str) -> str:
-    """Append a condition to a WHERE clause safely."""
-    if not where:
-        return f"WHERE {condition}"
-    return f"{where} AND {condition}"
 
+def _table(name: str) -> int:
+    """Ensure `name` is loaded as an in-memory table and return its parquet mtime.
 
-def _where(
-    year_min: int | None,
-    year_max: int | None,
-) -> str:
-    """Build a WHERE clause from optional year range."""
-    clauses: list[str] = []
-    if year_min is not None:
-        clauses.append(f"year >= {int(year_min)}")
-    if year_max is not None:
-        clauses.append(f"year <= {int(year_max)}")
-    return ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    Reloads the table when the parquet has changed since the last load. If the
+    file is missing or unreadable, the table is dropped and the error raised.
+    Must not be called while holding a pool cursor.
+    """
+    mtime = _mtime(name)
+    if _loaded.get(name) == mtime:
+        return mtime
+    with _load_lock, get_cursor() as cur:
+        if _loaded.get(name) != mtime:
+            try:
+                cur.execute(
+                    f"CREATE OR REPLACE TABLE {name} AS "
+                    f"SELECT {_COLUMNS[name]} FROM '{_AGG}/{name}.parquet'"
+                )
+            except duckdb.Error:
+                cur.execute(f"DROP TABLE IF EXISTS {name}")
+                _loaded.pop(name, None)
+                raise
+            _loaded[name] = mtime
+    return mtime
+
+
+def _fetch(sql: str, params: dict | None = None) -> pa.Table:
+    """Execute SQL with bound parameters and return the result as an Arrow table."""
+    with get_cursor() as cur:
+        return cur.execute(sql, params).fetch_arrow_table()
+
+
+def _run(sql: str, params: dict | None = None) -> list[dict]:
+    """Execute SQL with bound parameters and return list of row dicts."""
+    return _fetch(sql, params).to_pylist()
 
 
-def _run(sql: str) -> list[dict]:
-    """Execute SQL and return list of row dicts."""
-    con = duckdb.connect()
-    df = con.execute(sql).fetchdf()
-    con.close()
-    return df.to_dict(orient="records")
+# ── 1. Filter options ──
 
 
-# ── 1. Filter options ──
+@lru_cache(maxsize=8)
+def _filter_options(trends_mtime: int, geo_mtime: int) -> tuple[tuple[int, ...], tuple[str, ...]]:
+    # Both queries ORDER BY, so no sorting here
+    with get_cursor() as cur:
+        years = tuple(y for (y,) in cur.execute(_YEARS_SQL).fetchall())
+        try:
+            regions = tuple(r for (r,) in cur.execute(_REGIONS_SQL).fetchall())
+        except Exception:
+            regions = ()
+    return years, regions
 
 
 def get_filter_options() -> dict:
     """Return available years and regions."""
-    con = duckdb.connect()
-    years = sorted(
-        con.execute(
-            f"SELECT DISTINCT year FROM '{_AGG}/pit_trends.parquet' "
-            "WHERE year IS NOT NULL ORDER BY year"
-        ).fetchdf()["year"].tolist()
-    )
     try:
-        regions = con.execute(
-            f"SELECT DISTINCT region FROM '{_AGG}/pit_geography.parquet' "
-            "WHERE region IS NOT NULL ORDER BY region"
-        ).fetchdf()["region"].tolist()
-    except Exception:
-        regions = []
-    con.close()
+        geo_mtime = _table("pit_geography")
+    except duckdb.Error:
+        geo_mtime = 0
+    years, regions = _filter_options(_table("pit_trends"), geo_mtime)
     return {
-        "years": [int(y) for y in years],
-        "regions": regions,
+        "years": list(years),
+        "regions": list(regions),
     }
 
 
@@ -78,50 +155,43 @@ def get_overview(year: int | None = None) -> dict:
 
     If year is None, uses the most recent year available.
     """
-    con = duckdb.connect()
-
-    if year is None:
-        year = con.execute(
-            f"SELECT MAX(year) FROM '{_AGG}/pit_trends.parquet'"
-        ).fetchone()[0]
-
-    current = con.execute(
-        f"SELECT total, sheltered, unsheltered FROM '{_AGG}/pit_trends.parquet' "
-        f"WHERE year = {int(year)}"
-    ).fetchone()
-
-    prior = con.execute(
-        f"SELECT total FROM '{_AGG}/pit_trends.parquet' "
-        f"WHERE year = {int(year) - 1}"
-    ).fetchone()
-
-    con.close()
+    _table("pit_trends")
+    with get_cursor() as cur:
+        rows = cur.execute(
+            _OVERVIEW_SQL, {"year": None if year is None else int(year)}
+        ).fetchall()
+
+    if year is None and rows:
+        year = rows[0][0]
+    by_year = {row[0]: row[1:] for row in rows}
+    current = by_year.get(year)
+    prior = by_year.get(year - 1) if year is not None else None
 
     if current is None:
         return {"year": year, "total": 0, "sheltered": 0, "unsheltered": 0,
                 "prior_year_total": None, "yoy_change": None, "yoy_pct": None}
 
+    # DuckDB already returns Python ints; no per-field conversion needed
     total, sheltered, unsheltered = current
-    result = {
-        "year": int(year),
-        "total": int(total),
-        "sheltered": int(sheltered),
-        "unsheltered": int(unsheltered),
-        "prior_year_total": None,
-        "yoy_change": None,
-        "yoy_pct": None,
+    prior_total = prior[0] if prior else None
+    yoy = total - prior_total if prior_total is not None else None
+    return {
+        "year": year,
+        "total": total,
+        "sheltered": sheltered,
+        "unsheltered": unsheltered,
+        "prior_year_total": prior_total,
+        "yoy_change": yoy,
+        "yoy_pct": round(yoy * 100 / prior_total, 1) if prior_total else None,
     }
 
-    if prior:
-        prior_total = int(prior[0])
-        result["prior_year_total"] = prior_total
-        result["yoy_change"] = int(total) - prior_total
-        result["yoy_pct"] = round((int(total) - prior_total) / prior_total * 100, 1)
 
-    return result
+# ── 3. PIT Trends ──
 
 
-# ── 3. PIT Trends ──
+@lru_cache(maxsize=256)
+def _pit_trends(year_min: int, year_max: int, mtime: int) -> pa.Table:
+    return _fetch(_PIT_TRENDS_SQL, {"year_min": year_min, "year_max": year_max})
 
 
 def get_pit_trends(
@@ -129,12 +199,15 @@ def get_pit_trends(
     year_max: int = 2024,
 ) -> list[dict]:
     """Annual PIT totals over time: year, total, sheltered, unsheltered."""
-    w = _where(year_min, year_max)
-    return _run(
-        f"SELECT year, total, sheltered, unsheltered "
-        f"FROM '{_AGG}/pit_trends.parquet' {w} "
-        f"ORDER BY year"
-    )
+    return _pit_trends(year_min, year_max, _table("pit_trends")).to_pylist()
+
+
+def get_pit_trends_arrow(
+    year_min: int = 2011,
+    year_max: int = 2024,
+) -> pa.Table:
+    """Same rows as get_pit_trends, as an Arrow table."""
+    return _pit_trends(year_min, year_max, _table("pit_trends"))
 
 
 # ── 4. Subpopulations ──
@@ -146,14 +219,10 @@ def get_subpopulations(
     group: str | None = None,
 ) -> list[dict]:
     """Demographic subgroup counts by year."""
-    w = _where(year_min, year_max)
-    if group:
-        safe_group = group.replace("'", "''")
-        w = _q(w, f"group_name = '{safe_group}'")
+    _table("pit_subpopulations")
     return _run(
-        f"SELECT year, group_name, count "
-        f"FROM '{_AGG}/pit_subpopulations.parquet' {w} "
-        f"ORDER BY year, group_name"
+        _SUBPOPULATIONS_SQL,
+        {"year_min": year_min, "year_max": year_max, "group": group or None},
     )
 
 
@@ -165,28 +234,19 @@ def get_geography(
     region: str | None = None,
 ) -> list[dict]:
     """Subregional PIT counts. Defaults to most recent year."""
-    con = duckdb.connect()
-
-    if year is None:
-        year = con.execute(
-            f"SELECT MAX(year) FROM '{_AGG}/pit_geography.parquet'"
-        ).fetchone()[0]
+    _table("pit_geography")
+    return _run(
+        _GEOGRAPHY_SQL,
+        {"year": None if year is None else int(year), "region": region or None},
+    )
 
-    w = f"WHERE year = {int(year)}"
-    if region:
-        safe_region = region.replace("'", "''")
-        w += f" AND region = '{safe_region}'"
 
-    df = con.execute(
-        f"SELECT year, region, total, sheltered, unsheltered "
-        f"FROM '{_AGG}/pit_geography.parquet' {w} "
-        f"ORDER BY total DESC"
-    ).fetchdf()
-    con.close()
-    return df.to_dict(orient="records")
+# ── 6. Spending trends ──
 
 
-# ── 6. Spending trends ──
+@lru_cache(maxsize=256)
+def _spending_trends(fy_min: int, fy_max: int, mtime: int) -> pa.Table:
+    return _fetch(_SPENDING_SQL, {"fy_min": fy_min, "fy_max": fy_max})
 
 
 def get_spending_trends(
@@ -194,9 +254,4 @@ def get_spending_trends(
     fy_max: int = 2026,
 ) -> list[dict]:
     """City homelessness department spending by fiscal year."""
-    return _run(
-        f"SELECT fiscal_year, amount "
-        f"FROM '{_AGG}/homelessness_spending.parquet' "
-        f"WHERE fiscal_year >= {int(fy_min)} AND fiscal_year <= {int(fy_max)} "
-        f"ORDER BY fiscal_year"
-    )
+    return _spending_trends(fy_min, fy_max, _table("homelessness_spending")).to_pylist()
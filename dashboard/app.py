@@ -26,12 +26,39 @@ CHART_COLOR = "#83c9ff"
 CHART_COLOR_2 = "#2a6496"
 
 
-def query(sql: str, params: list | None = None):
+def _query_uncached(sql: str, params: list | None = None):
     """Run SQL against parquet files and return a pandas DataFrame."""
     con = duckdb.connect()
     return con.execute(sql, params or []).fetchdf()
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def query(sql: str, params: tuple = ()):
+    """Cached query — keyed on the SQL text and params, so reruns skip DuckDB."""
+    return _query_uncached(sql, list(params))
+
+
+@st.cache_resource(show_spinner=False)
+def _donut(unsheltered: int, sheltered: int) -> go.Figure:
+    """Sheltered vs unsheltered donut — built once per pair of counts."""
+    fig = go.Figure(go.Pie(
+        labels=["Unsheltered", "Sheltered"],
+        values=[unsheltered, sheltered],
+        hole=0.5,
+        marker=dict(colors=[CHART_COLOR, CHART_COLOR_2]),
+        textinfo="label+percent",
+        textfont=dict(size=14),
+    ))
+    fig.update_layout(
+        height=350,
+        margin=dict(l=10, r=10, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        showlegend=False,
+    )
+    return fig
+
+
 # ── Sidebar filters ──
 st.sidebar.title("Filters")
 
@@ -103,24 +130,23 @@ tab_overview, tab_trends, tab_demographics, tab_geography, tab_spending = st.tab
 
 # ── TAB 1: Overview ──
 with tab_overview:
-    # Latest year data
-    latest = query(f"""
-        SELECT * FROM '{_AGG}/pit_trends.parquet'
-        WHERE year = (SELECT MAX(year) FROM '{_AGG}/pit_trends.parquet')
-    """)
-    prior = query(f"""
-        SELECT * FROM '{_AGG}/pit_trends.parquet'
-        WHERE year = (SELECT MAX(year) - 1 FROM '{_AGG}/pit_trends.parquet')
+    # Latest year and the year before it (if present), newest first
+    recent = query(f"""
+        SELECT year, total, sheltered, unsheltered
+        FROM '{_AGG}/pit_trends.parquet'
+        WHERE year >= (SELECT MAX(year) - 1 FROM '{_AGG}/pit_trends.parquet')
+        ORDER BY year DESC
     """)
 
-    if not latest.empty:
-        latest_year = int(latest["year"].iloc[0])
-        latest_total = int(latest["total"].iloc[0])
-        latest_sheltered = int(latest["sheltered"].iloc[0])
-        latest_unsheltered = int(latest["unsheltered"].iloc[0])
+    if not recent.empty:
+        latest = recent.iloc[0]
+        latest_year = int(latest["year"])
+        latest_total = int(latest["total"])
+        latest_sheltered = int(latest["sheltered"])
+        latest_unsheltered = int(latest["unsheltered"])
 
-        if not prior.empty:
-            prior_total = int(prior["total"].iloc[0])
+        if len(recent) > 1:
+            prior_total = int(recent["total"].iloc[1])
             yoy_change = latest_total - prior_total
             yoy_pct = yoy_change / prior_total * 100
             delta_str = f"{yoy_change:+,} ({yoy_pct:+.1f}%)"
@@ -141,22 +167,11 @@ with tab_overview:
         col_chart, col_context = st.columns([1, 1])
 
         with col_chart:
-            fig = go.Figure(go.Pie(
-                labels=["Unsheltered", "Sheltered"],
-                values=[latest_unsheltered, latest_sheltered],
-                hole=0.5,
-                marker=dict(colors=[CHART_COLOR, CHART_COLOR_2]),
-                textinfo="label+percent",
-                textfont=dict(size=14),
-            ))
-            fig.update_layout(
-                height=350,
-                margin=dict(l=10, r=10, t=10, b=10),
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-                showlegend=False,
+            st.plotly_chart(
+                _donut(latest_unsheltered, latest_sheltered),
+                use_container_width=True,
+                theme=None,
             )
-            st.plotly_chart(fig, use_container_width=True, theme=None)
 
         with col_context:
             st.markdown(f"""
@@ -172,57 +187,58 @@ with tab_overview:
         # Mini trend sparkline
         st.subheader("Trend at a Glance")
         spark = query(f"""
-            SELECT year AS "Year", total AS "Total Homeless"
+            SELECT CAST(year AS VARCHAR) AS "Year", total AS "Total Homeless"
             FROM '{_AGG}/pit_trends.parquet'
             ORDER BY year
         """)
         if not spark.empty:
-            spark["Year"] = spark["Year"].astype(str)
             st.line_chart(spark.set_index("Year"), color=CHART_COLOR)
 
 # ── TAB 2: Trends ──
 with tab_trends:
     st.subheader("PIT Count Over Time")
 
+    # Chart-ready columns; YoY is computed over the selected range only
     trends = query(f"""
-        SELECT year, total, sheltered, unsheltered
+        SELECT
+            CAST(year AS VARCHAR) AS "Year",
+            total AS "Total",
+            sheltered AS "Sheltered",
+            unsheltered AS "Unsheltered",
+            total - LAG(total) OVER (ORDER BY year) AS "Change",
+            (total - LAG(total) OVER (ORDER BY year)) * 100.0
+                / LAG(total) OVER (ORDER BY year) AS "% Change"
         FROM '{_AGG}/pit_trends.parquet'
-        WHERE year BETWEEN {year_range[0]} AND {year_range[1]}
+        WHERE year BETWEEN ? AND ?
         ORDER BY year
-    """)
+    """, year_range)
 
     if not trends.empty:
         # Total trend with sheltered/unsheltered breakdown
-        chart_data = trends.copy()
-        chart_data = chart_data.rename(columns={
-            "year": "Year",
-            "sheltered": "Sheltered",
-            "unsheltered": "Unsheltered",
-        })[["Year", "Sheltered", "Unsheltered"]]
-        chart_data["Year"] = chart_data["Year"].astype(str)
-        st.bar_chart(chart_data.set_index("Year"), color=[CHART_COLOR, CHART_COLOR_2])
+        chart_data = trends.set_index("Year")
+        st.bar_chart(chart_data[["Sheltered", "Unsheltered"]], color=[CHART_COLOR, CHART_COLOR_2])
         st.caption("Stacked bar shows sheltered (light) and unsheltered (dark) breakdown each year.")
 
         # Total line chart
         st.subheader("Total PIT Count Trend")
-        total_data = trends[["year", "total"]].copy()
-        total_data = total_data.rename(columns={"year": "Year", "total": "Total"})
-        total_data["Year"] = total_data["Year"].astype(str)
-        st.line_chart(total_data.set_index("Year"), color=CHART_COLOR)
+        st.line_chart(chart_data[["Total"]], color=CHART_COLOR)
 
-        # Year-over-year changes
+        # Year-over-year changes, newest first
         st.subheader("Year-Over-Year Change")
-        yoy = trends.copy()
-        yoy["change"] = yoy["total"].diff()
-        yoy["pct_change"] = yoy["total"].pct_change() * 100
-        yoy = yoy.dropna(subset=["change"])
-        yoy = yoy.sort_values("year", ascending=False)
-        yoy_display = yoy[["year", "total", "change", "pct_change"]].copy()
-        yoy_display.columns = ["Year", "Total", "Change", "% Change"]
-        yoy_display["Change"] = yoy_display["Change"].apply(lambda x: f"{x:+,.0f}")
-        yoy_display["% Change"] = yoy_display["% Change"].apply(lambda x: f"{x:+.1f}%")
-        yoy_display["Total"] = yoy_display["Total"].apply(lambda x: f"{x:,}")
-        st.dataframe(yoy_display, use_container_width=True, hide_index=True)
+        yoy = trends.dropna(subset=["Change"]).iloc[::-1]
+        yoy_display = yoy[["Year", "Total", "% Change"]].assign(
+            # Streamlit's printf formats can't combine a sign with thousands separators
+            Change=yoy["Change"].map("{:+,.0f}".format),
+        )[["Year", "Total", "Change", "% Change"]]
+        st.dataframe(
+            yoy_display,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Total": st.column_config.NumberColumn(format="localized"),
+                "% Change": st.column_config.NumberColumn(format="%+.1f%%"),
+            },
+        )
     else:
         st.info("No PIT count data available for the selected year range.")
 
@@ -235,31 +251,35 @@ with tab_demographics:
         "continuously homeless for 1+ year or 4+ times in 3 years."
     )
 
-    subpop = query(f"""
-        SELECT year, group_name, count
-        FROM '{_AGG}/pit_subpopulations.parquet'
-        WHERE year BETWEEN {year_range[0]} AND {year_range[1]}
-        ORDER BY year, group_name
-    """)
+    # PIVOT can't take parameters in its source when the columns come from
+    # the data, so the year range is applied to the pivoted rows instead.
+    # Groups with no counts in the range come back all NULL and are dropped
+    # below rather than drawn as zeros.
+    pivot = query(f"""
+        SELECT * REPLACE (CAST(year AS VARCHAR) AS year) FROM (
+            PIVOT '{_AGG}/pit_subpopulations.parquet'
+            ON group_name
+            USING SUM(count)
+            GROUP BY year
+        )
+        WHERE year BETWEEN ? AND ?
+        ORDER BY year
+    """, year_range)
 
-    if not subpop.empty:
+    if not pivot.empty:
         # Pivoted line chart
-        pivot = subpop.pivot_table(
-            index="year", columns="group_name", values="count", fill_value=0
-        )
-        pivot.index = pivot.index.astype(str)
-        st.line_chart(pivot)
+        st.line_chart(pivot.set_index("year").dropna(axis=1, how="all").fillna(0))
 
         # Latest year breakdown
-        latest_year_subpop = subpop["year"].max()
-        latest_subpop = subpop[subpop["year"] == latest_year_subpop].copy()
-        latest_subpop = latest_subpop.rename(columns={
-            "group_name": "Subpopulation",
-            "count": "Count",
-        })[["Subpopulation", "Count"]]
-        latest_subpop = latest_subpop.sort_values("Count", ascending=False)
-
-        st.subheader(f"{int(latest_year_subpop)} Subpopulation Breakdown")
+        latest_year_subpop = int(pivot["year"].iloc[-1])
+        latest_subpop = query(f"""
+            SELECT group_name AS "Subpopulation", count AS "Count"
+            FROM '{_AGG}/pit_subpopulations.parquet'
+            WHERE year = ?
+            ORDER BY count DESC
+        """, (latest_year_subpop,))
+
+        st.subheader(f"{latest_year_subpop} Subpopulation Breakdown")
         st.bar_chart(
             latest_subpop.set_index("Subpopulation"),
             horizontal=True,
@@ -269,16 +289,21 @@ with tab_demographics:
         # As percentage of total
         total_for_year = query(f"""
             SELECT total FROM '{_AGG}/pit_trends.parquet'
-            WHERE year = {int(latest_year_subpop)}
-        """)
+            WHERE year = ?
+        """, (latest_year_subpop,))
         if not total_for_year.empty:
             total = int(total_for_year["total"].iloc[0])
             pct_data = latest_subpop.copy()
-            pct_data["% of Total"] = pct_data["Count"].apply(
-                lambda x: f"{x / total * 100:.1f}%"
+            pct_data["% of Total"] = pct_data["Count"] / total * 100
+            st.dataframe(
+                pct_data,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Count": st.column_config.NumberColumn(format="localized"),
+                    "% of Total": st.column_config.NumberColumn(format="%.1f%%"),
+                },
             )
-            pct_data["Count"] = pct_data["Count"].apply(lambda x: f"{x:,}")
-            st.dataframe(pct_data, use_container_width=True, hide_index=True)
     else:
         st.info("No subpopulation data available for the selected year range.")
 
@@ -290,74 +315,78 @@ with tab_geography:
         "Data is available for 2023-2024."
     )
 
-    geo_where = f"WHERE year BETWEEN {year_range[0]} AND {year_range[1]}"
+    geo_where = "WHERE year BETWEEN ? AND ?"
     if selected_regions:
-        escaped = ", ".join(f"'{r.replace(chr(39), chr(39)*2)}'" for r in selected_regions)
-        geo_where += f" AND region IN ({escaped})"
+        geo_where += f" AND region IN ({', '.join('?' * len(selected_regions))})"
 
     geo = query(f"""
-        SELECT year, region, total, sheltered, unsheltered
+        SELECT
+            year AS "Year",
+            region AS "Region",
+            total AS "Total",
+            sheltered AS "Sheltered",
+            unsheltered AS "Unsheltered",
+            unsheltered * 100.0 / total AS "Unsheltered %"
         FROM '{_AGG}/pit_geography.parquet'
         {geo_where}
         ORDER BY year, total DESC
-    """)
+    """, (*year_range, *selected_regions))
 
     if not geo.empty:
         # Latest year geographic bar chart
-        latest_geo_year = int(geo["year"].max())
-        latest_geo = geo[geo["year"] == latest_geo_year].copy()
+        latest_geo_year = int(geo["Year"].max())
+        latest_geo = geo[geo["Year"] == latest_geo_year]
 
         st.subheader(f"{latest_geo_year} PIT Count by Region")
-        chart_geo = latest_geo[["region", "sheltered", "unsheltered"]].copy()
-        chart_geo = chart_geo.rename(columns={
-            "region": "Region",
-            "sheltered": "Sheltered",
-            "unsheltered": "Unsheltered",
-        })
         st.bar_chart(
-            chart_geo.set_index("Region"),
+            latest_geo.set_index("Region")[["Sheltered", "Unsheltered"]],
             horizontal=True,
             color=[CHART_COLOR, CHART_COLOR_2],
         )
 
         # Detail table
-        detail_geo = latest_geo.rename(columns={
-            "year": "Year",
-            "region": "Region",
-            "total": "Total",
-            "sheltered": "Sheltered",
-            "unsheltered": "Unsheltered",
-        })
-        detail_geo["Unsheltered %"] = (
-            detail_geo["Unsheltered"] / detail_geo["Total"] * 100
-        ).apply(lambda x: f"{x:.0f}%")
-        detail_geo["Total"] = detail_geo["Total"].apply(lambda x: f"{x:,}")
-        detail_geo["Sheltered"] = detail_geo["Sheltered"].apply(lambda x: f"{x:,}")
-        detail_geo["Unsheltered"] = detail_geo["Unsheltered"].apply(lambda x: f"{x:,}")
         st.dataframe(
-            detail_geo[["Region", "Total", "Sheltered", "Unsheltered", "Unsheltered %"]],
+            latest_geo[["Region", "Total", "Sheltered", "Unsheltered", "Unsheltered %"]],
             use_container_width=True,
             hide_index=True,
+            column_config={
+                "Total": st.column_config.NumberColumn(format="localized"),
+                "Sheltered": st.column_config.NumberColumn(format="localized"),
+                "Unsheltered": st.column_config.NumberColumn(format="localized"),
+                "Unsheltered %": st.column_config.NumberColumn(format="%.0f%%"),
+            },
         )
 
-        # YoY comparison if multiple years
-        available_years = sorted(geo["year"].unique())
-        if len(available_years) > 1:
+        # YoY comparison if multiple years: first vs last year per region
+        # still present in the latest year
+        if geo["Year"].nunique() > 1:
             st.subheader("Year-Over-Year by Region")
-            for region in sorted(latest_geo["region"].unique()):
-                region_data = geo[geo["region"] == region].sort_values("year")
-                if len(region_data) > 1:
-                    first = region_data.iloc[0]
-                    last = region_data.iloc[-1]
-                    change = int(last["total"]) - int(first["total"])
-                    pct = change / int(first["total"]) * 100 if first["total"] else 0
-                    # Green = decrease (better), Red = increase (worse)
-                    color = "red" if change > 0 else "green"
-                    st.markdown(
-                        f"**{region}**: {int(first['total']):,} ({int(first['year'])}) "
-                        f"&rarr; {int(last['total']):,} ({int(last['year'])}) — "
-                        f":{color}[{change:+,} ({pct:+.1f}%)]"
-                    )
+            region_yoy = query(f"""
+                SELECT
+                    region,
+                    MIN(year) AS y0,
+                    arg_min(total, year) AS t0,
+                    MAX(year) AS y1,
+                    arg_max(total, year) AS t1,
+                    arg_max(total, year) - arg_min(total, year) AS change,
+                    COALESCE(
+                        (arg_max(total, year) - arg_min(total, year)) * 100.0
+                            / NULLIF(arg_min(total, year), 0),
+                        0
+                    ) AS pct
+                FROM '{_AGG}/pit_geography.parquet'
+                {geo_where}
+                GROUP BY region
+                HAVING COUNT(*) > 1 AND MAX(year) = ?
+                ORDER BY region
+            """, (*year_range, *selected_regions, latest_geo_year))
+            if not region_yoy.empty:
+                # Green = decrease (better), Red = increase (worse)
+                st.markdown("\n\n".join(
+                    f"**{r.region}**: {r.t0:,} ({r.y0}) &rarr; {r.t1:,} ({r.y1}) — "
+                    f":{'red' if r.change > 0 else 'green'}[{r.change:+,} ({r.pct:+.1f}%)]"
+                    for r in region_yoy.itertuples()
+                ))
     else:
         st.info("No geographic data available for the selected filters.")
 
@@ -379,23 +408,20 @@ with tab_spending:
     )
 
     spending = query(f"""
-        SELECT fiscal_year, amount
+        SELECT
+            CAST(fiscal_year AS VARCHAR) AS "Fiscal Year",
+            amount / 1e6 AS "Amount ($M)"
         FROM '{_AGG}/homelessness_spending.parquet'
         ORDER BY fiscal_year
     """)
 
     if not spending.empty:
-        # Spending trend
-        spend_chart = spending.copy()
-        spend_chart["Amount ($M)"] = spend_chart["amount"] / 1e6
-        spend_chart["Fiscal Year"] = spend_chart["fiscal_year"].astype(str)
-
         col_spend, col_pit = st.columns(2)
 
         with col_spend:
             st.subheader("Annual Budget")
             st.bar_chart(
-                spend_chart.set_index("Fiscal Year")[["Amount ($M)"]],
+                spending.set_index("Fiscal Year")[["Amount ($M)"]],
                 color=CHART_COLOR,
                 y_label="Millions ($)",
             )
@@ -403,13 +429,12 @@ with tab_spending:
         with col_pit:
             st.subheader("PIT Count (Same Period)")
             pit_for_spend = query(f"""
-                SELECT year AS "Year", total AS "Total"
+                SELECT CAST(year AS VARCHAR) AS "Year", total AS "Total"
                 FROM '{_AGG}/pit_trends.parquet'
                 WHERE year >= 2021
                 ORDER BY year
             """)
             if not pit_for_spend.empty:
-                pit_for_spend["Year"] = pit_for_spend["Year"].astype(str)
                 st.bar_chart(
                     pit_for_spend.set_index("Year"),
                     color=CHART_COLOR_2,
@@ -417,36 +442,36 @@ with tab_spending:
 
         # Combined view
         st.subheader("Spending vs. Outcomes")
-        combined = spending.copy()
-        combined = combined.rename(columns={"fiscal_year": "year"})
-
-        pit_all = query(f"""
-            SELECT year, total FROM '{_AGG}/pit_trends.parquet'
-            WHERE year >= 2021
+        outcomes = query(f"""
+            SELECT
+                CAST(s.fiscal_year AS VARCHAR) AS "Year",
+                s.amount / 1e6 AS "Budget",
+                p.total AS "PIT Count",
+                s.amount / p.total AS "Cost per Person"
+            FROM '{_AGG}/homelessness_spending.parquet' s
+            JOIN '{_AGG}/pit_trends.parquet' p ON p.year = s.fiscal_year
+            WHERE p.year >= 2021
+            ORDER BY s.fiscal_year
         """)
 
-        if not pit_all.empty:
-            merged = combined.merge(pit_all, on="year", how="inner")
-            if not merged.empty:
-                display_df = merged.copy()
-                display_df["Budget"] = display_df["amount"].apply(lambda x: f"${x / 1e6:.1f}M")
-                display_df["PIT Count"] = display_df["total"].apply(lambda x: f"{x:,}")
-                display_df["Cost per Person"] = (display_df["amount"] / display_df["total"]).apply(
-                    lambda x: f"${x:,.0f}"
-                )
-                display_df = display_df.rename(columns={"year": "Year"})
-                st.dataframe(
-                    display_df[["Year", "Budget", "PIT Count", "Cost per Person"]],
-                    use_container_width=True,
-                    hide_index=True,
-                )
+        if not outcomes.empty:
+            st.dataframe(
+                outcomes,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Budget": st.column_config.NumberColumn(format="$%.1fM"),
+                    "PIT Count": st.column_config.NumberColumn(format="localized"),
+                    "Cost per Person": st.column_config.NumberColumn(format="dollar"),
+                },
+            )
 
-                st.markdown(
-                    "**Note**: The city's homelessness budget does not represent all public spending "
-                    "on homelessness in San Diego. County, state, and federal programs contribute "
-                    "significantly. The 'cost per person' figure is a rough metric — it divides the "
-                    "city's department budget by the PIT count, not the total population served."
-                )
+            st.markdown(
+                "**Note**: The city's homelessness budget does not represent all public spending "
+                "on homelessness in San Diego. County, state, and federal programs contribute "
+                "significantly. The 'cost per person' figure is a rough metric — it divides the "
+                "city's department budget by the PIT count, not the total population served."
+            )
     else:
         st.info(
             "Spending data not available. Run the sd-city-budget pipeline first to "
@@ -0,0 +1,28 @@
+"""Connection settings shared by the pipeline's DuckDB connections.
+
+The pipeline's tables are a few thousand rows at most, so DuckDB's default
+of one worker thread per core mostly adds scheduling overhead. Override the
+caps with PIPELINE_DUCKDB_THREADS and PIPELINE_DUCKDB_MEMORY_LIMIT.
+"""
+
+from __future__ import annotations
+
+import os
+
+import duckdb
+
+THREADS = int(os.environ.get("PIPELINE_DUCKDB_THREADS", "2"))
+MEMORY_LIMIT = os.environ.get("PIPELINE_DUCKDB_MEMORY_LIMIT", "512MB")
+
+
+def configure(con: duckdb.DuckDBPyConnection) -> duckdb.DuckDBPyConnection:
+    """Apply the pipeline's thread, memory and ordering settings to `con`.
+
+    Settings are GLOBAL so cursors opened from `con` inherit them. Every
+    query whose row order matters has an ORDER BY, so DuckDB needn't also
+    preserve insertion order.
+    """
+    con.execute(f"SET GLOBAL threads = {THREADS}")
+    con.execute("SET GLOBAL memory_limit = ?", [MEMORY_LIMIT])
+    con.execute("SET GLOBAL preserve_insertion_order = false")
+    return con
@@ -0,0 +1,13 @@
+"""Filesystem helpers shared by the pipeline steps."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+
+def file_size(path: Path) -> int | None:
+    """Size of `path` in bytes from a single stat, or None if it's missing."""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,43 @@
+"""Input hashes from the last transform run, for skipping unchanged steps.
+
+The manifest is a small JSON file mapping each transform step to a hash of
+the inputs it was last built from.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Iterable
+from pathlib import Path
+
+
+def compute_hash(paths: Iterable[Path], *extra: str) -> str:
+    """SHA-256 over the contents of `paths` plus any `extra` strings.
+
+    A missing file hashes differently from any existing one, so a step whose
+    input appears or disappears is rebuilt.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path).encode())
+        try:
+            with path.open("rb") as f:
+                digest.update(hashlib.file_digest(f, "sha256").digest())
+        except FileNotFoundError:
+            digest.update(b"\0missing")
+    for value in extra:
+        digest.update(value.encode())
+    return digest.hexdigest()
+
+
+def load_state(path: Path) -> dict[str, str]:
+    """Read the manifest, or return an empty one if it's missing or unreadable."""
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(path: Path, state: dict[str, str]) -> None:
+    path.write_text(json.dumps(state, indent=2, sort_keys=True) + "\n")
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import argparse
+import logging
 import sys
 import time
 
@@ -9,27 +11,34 @@ from pipeline.ingest import ingest
 from pipeline.transform import transform
 from pipeline.validate import validate
 
+logger = logging.getLogger(__name__)
+
 
 def main() -> None:
-    force = "--force" in sys.argv
+    parser = argparse.ArgumentParser(description="Run the pipeline: ingest → transform → validate.")
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild every output even if its inputs are unchanged"
+    )
+    force = parser.parse_args().force
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.INFO)
     t0 = time.time()
 
-    print("=" * 60)
-    print("San Diego Homelessness Pipeline")
-    print("=" * 60)
+    logger.info("=" * 60)
+    logger.info("San Diego Homelessness Pipeline")
+    logger.info("=" * 60)
 
-    print("\n── Step 1: Ingest ──")
+    logger.info("\n── Step 1: Ingest ──")
     paths = ingest(force=force)
-    print(f"  {len(paths)} files ready\n")
+    logger.info("  %d files ready\n", len(paths))
 
-    print("── Step 2: Transform ──")
-    transform()
+    logger.info("── Step 2: Transform ──")
+    transform(force=force)
 
-    print("\n── Step 3: Validate ──")
+    logger.info("\n── Step 3: Validate ──")
     failures = validate()
 
     elapsed = time.time() - t0
-    print(f"\nPipeline complete in {elapsed:.1f}s")
+    logger.info("\nPipeline complete in %.1fs", elapsed)
 
     if failures > 0:
         sys.exit(1)
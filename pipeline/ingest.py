@@ -8,8 +8,15 @@ and copies cross-reference budget data from the sd-city-budget project.
 
 from __future__ import annotations
 
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from pipeline._files import file_size
+
+logger = logging.getLogger(__name__)
+
 RAW_DIR = Path(__file__).resolve().parent.parent / "data" / "raw"
 
 # Cross-reference: homelessness spending from city budget project
@@ -25,24 +32,27 @@ EXPECTED_CSVS = [
 def verify_raw_data() -> list[Path]:
     """Verify that manually-compiled CSVs exist and are non-empty."""
     RAW_DIR.mkdir(parents=True, exist_ok=True)
+    candidates = [RAW_DIR / name for name in EXPECTED_CSVS]
+    # stat() releases the GIL, so the probes overlap on slow filesystems
+    with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+        sizes = list(pool.map(file_size, candidates))
     paths = []
-    for name in EXPECTED_CSVS:
-        path = RAW_DIR / name
-        if path.exists() and path.stat().st_size > 0:
-            print(f"  [ok] {name} ({path.stat().st_size:,} bytes)")
+    for name, path, size in zip(EXPECTED_CSVS, candidates, sizes):
+        if size:
+            logger.info("  [ok] %s (%d bytes)", name, size)
             paths.append(path)
         else:
-            print(f"  [missing] {name} — create manually from RTFH/HUD reports")
+            logger.warning("  [missing] %s — create manually from RTFH/HUD reports", name)
     return paths
 
 
 def check_budget_crossref() -> bool:
     """Check if cross-reference budget parquet is available."""
-    if BUDGET_PARQUET.exists():
-        size = BUDGET_PARQUET.stat().st_size
-        print(f"  [ok] budget cross-reference ({size:,} bytes)")
+    size = file_size(BUDGET_PARQUET)
+    if size is not None:
+        logger.info("  [ok] budget cross-reference (%d bytes)", size)
         return True
-    print("  [warn] sd-city-budget parquet not found — spending tab will be empty")
+    logger.warning("  [warn] sd-city-budget parquet not found — spending tab will be empty")
     return False
 
 
@@ -55,4 +65,5 @@ def ingest(*, force: bool = False) -> list[Path]:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.INFO)
     ingest()
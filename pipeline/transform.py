@@ -2,64 +2,215 @@
 
 from __future__ import annotations
 
+import argparse
+import logging
+import os
+import sys
 from pathlib import Path
 
 import duckdb
 
+from pipeline._connect import configure
+from pipeline._state import compute_hash, load_state, save_state
+
+logger = logging.getLogger(__name__)
+
 RAW_DIR = Path(__file__).resolve().parent.parent / "data" / "raw"
 PROCESSED_DIR = Path(__file__).resolve().parent.parent / "data" / "processed"
 AGGREGATED_DIR = Path(__file__).resolve().parent.parent / "data" / "aggregated"
 DB_PATH = Path(__file__).resolve().parent.parent / "db" / "homelessness.duckdb"
 
+# Raw CSV file behind each raw table
+RAW_FILES = {
+    "raw_pit_counts": "pit_counts.csv",
+    "raw_pit_subpopulations": "pit_subpopulations.csv",
+    "raw_pit_geography": "pit_geography.csv",
+}
+
+# Raw CSV columns with their final types. Declaring them up front lets
+# read_csv skip its sniffing pass. Only the year is typed while parsing
+# (rows without a valid one are skipped and reported); the counts are read
+# as text and TRY_CAST by _select_raw, so a bad cell becomes NULL instead
+# of dropping the whole row. This is the one place the schema is spelled out.
+RAW_COLUMNS = {
+    "raw_pit_counts": {
+        "year": "INTEGER",
+        "total_homeless": "INTEGER",
+        "sheltered": "INTEGER",
+        "unsheltered": "INTEGER",
+        "chronically_homeless": "INTEGER",
+        "veterans": "INTEGER",
+        "families_persons": "INTEGER",
+        "youth_under25": "INTEGER",
+        "first_time_homeless": "INTEGER",
+    },
+    "raw_pit_subpopulations": {
+        "year": "INTEGER",
+        "group_name": "VARCHAR",
+        "count": "INTEGER",
+    },
+    "raw_pit_geography": {
+        "year": "INTEGER",
+        "region": "VARCHAR",
+        "total": "INTEGER",
+        "sheltered": "INTEGER",
+        "unsheltered": "INTEGER",
+    },
+}
+
+# Parquet write options for every COPY. The outputs are a few KB, where
+# snappy is cheaper to write and read than zstd; set PARQUET_COMPRESSION
+# (e.g. "zstd") to change it. Row groups are capped well below DuckDB's
+# 122,880-row default so sorted outputs keep per-group min/max stats
+# readers can skip on if the tables grow.
+_COMPRESSION = os.environ.get("PARQUET_COMPRESSION", "snappy")
+_COPY_OPTIONS = f"FORMAT PARQUET, COMPRESSION {_COMPRESSION}, ROW_GROUP_SIZE 4096"
+
+# Set PIPELINE_EXPLAIN=1 to log the profiled plan of the budget scan
+EXPLAIN = os.environ.get("PIPELINE_EXPLAIN") == "1"
+
 # Cross-reference budget parquet
 BUDGET_PARQUET = Path.home() / "dev-brain" / "sd-city-budget" / "data" / "aggregated" / "dept_budget_trends.parquet"
 
 
-def transform(*, db_path: Path | None = None) -> None:
-    """Load raw CSVs, build processed + aggregated parquets."""
+def transform(*, db_path: Path | None = None, force: bool = False) -> None:
+    """Load raw CSVs, build processed + aggregated parquets.
+
+    Each step is skipped when its inputs and this module's code hash the
+    same as in the last run (recorded next to the database as
+    <db>.state.json) and its outputs still exist. force=True rebuilds everything regardless.
+    """
     db = db_path or DB_PATH
     db.parent.mkdir(parents=True, exist_ok=True)
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     AGGREGATED_DIR.mkdir(parents=True, exist_ok=True)
 
-    con = duckdb.connect(str(db))
+    # ── Work out which steps have changed inputs or missing outputs ──
+    state_path = db.with_suffix(".state.json")
+    state = load_state(state_path)
+    raw_csvs = [RAW_DIR / filename for filename in RAW_FILES.values()]
+    # This module holds the schema and every export's SQL, so editing it
+    # invalidates all steps
+    code = compute_hash([Path(__file__)])
+    hashes = {
+        "processed": compute_hash([RAW_DIR / RAW_FILES["raw_pit_counts"]], code, _COPY_OPTIONS),
+        "aggregations": compute_hash(raw_csvs, code, _COPY_OPTIONS),
+        "spending": compute_hash([BUDGET_PARQUET], code, _COPY_OPTIONS),
+    }
+    outputs = {
+        "processed": [PROCESSED_DIR / "pit_data.parquet"],
+        "aggregations": [
+            AGGREGATED_DIR / f"{name}.parquet"
+            for name in ("pit_trends", "pit_subpopulations", "pit_geography")
+        ],
+        "spending": [AGGREGATED_DIR / "homelessness_spending.parquet"],
+    }
+    stale = {
+        step for step, digest in hashes.items()
+        if force
+        or state.get(step) != digest
+        or not all(path.exists() for path in outputs[step])
+    }
+    for step in hashes:
+        if step not in stale:
+            logger.info("  [skip] %s — inputs unchanged", step)
+    if not stale:
+        logger.info("Transform complete.")
+        return
+
+    con = configure(duckdb.connect(str(db)))
+    rebuild_pit = bool(stale & {"processed", "aggregations"})
 
     # ── Load raw CSVs ──
-    _load_raw_tables(con)
+    if rebuild_pit:
+        _load_raw_tables(con)
+
+    con.execute("BEGIN TRANSACTION")
+
+    # ── Cast the PIT counts once for every export that reads them ──
+    if rebuild_pit:
+        _build_pit_typed(con)
 
     # ── Export processed parquet (full PIT data) ──
-    _export_processed(con)
+    if "processed" in stale:
+        _export_processed(con)
 
     # ── Build aggregations ──
-    _build_aggregations(con)
+    if "aggregations" in stale:
+        _build_aggregations(con)
 
     # ── Build spending cross-reference ──
-    _build_spending_crossref(con)
+    if "spending" in stale:
+        _build_spending_crossref(con)
 
+    con.execute("COMMIT")
+    if rebuild_pit:
+        con.execute("DROP TABLE pit_typed")
     con.close()
-    print("Transform complete.")
+    save_state(state_path, {**state, **hashes})
+    logger.info("Transform complete.")
 
 
 def _load_raw_tables(con: duckdb.DuckDBPyConnection) -> None:
     """Load the raw CSVs into DuckDB tables."""
-    csv_files = {
-        "raw_pit_counts": RAW_DIR / "pit_counts.csv",
-        "raw_pit_subpopulations": RAW_DIR / "pit_subpopulations.csv",
-        "raw_pit_geography": RAW_DIR / "pit_geography.csv",
-    }
-    for name, path in csv_files.items():
+    for name, filename in RAW_FILES.items():
+        path = RAW_DIR / filename
         if not path.exists():
-            print(f"  [warn] {path.name} not found, skipping")
+            logger.warning("  [warn] %s not found, skipping", path.name)
             con.execute(f"DROP TABLE IF EXISTS {name}")
             con.execute(f"CREATE TABLE {name} (dummy INTEGER)")
             continue
         con.execute(f"DROP TABLE IF EXISTS {name}")
         con.execute(f"""
             CREATE TABLE {name} AS
-            SELECT * FROM read_csv('{path}', header=true, ignore_errors=true)
-        """)
+            SELECT * FROM read_csv(
+                ?, header=true, auto_detect=false, columns=?, store_rejects=true
+            )
+        """, [str(path), _read_columns(name)])
         count = con.execute(f"SELECT count(*) FROM {name}").fetchone()[0]
-        print(f"  Loaded {name}: {count:,} rows")
+        logger.info("  Loaded %s: %d rows", name, count)
+        rejects = con.execute("""
+            SELECT DISTINCT e.line, e.csv_line
+            FROM reject_errors e
+            JOIN reject_scans s USING (scan_id, file_id)
+            WHERE s.file_path = ?
+            ORDER BY e.line
+        """, [str(path)]).fetchall()
+        for line, csv_line in rejects:
+            logger.warning("  [warn] %s line %s skipped: %s", path.name, line, csv_line)
+
+
+def _read_columns(table: str) -> dict[str, str]:
+    """read_csv column types for a raw table: the year typed, the rest as text."""
+    return {
+        col: typ if col == "year" else "VARCHAR"
+        for col, typ in RAW_COLUMNS[table].items()
+    }
+
+
+def _select_raw(table: str) -> str:
+    """SELECT of a raw table's columns in RAW_COLUMNS order, cast to their types.
+
+    Values that don't parse become NULL.
+    """
+    columns = [
+        col if col == "year" or typ == "VARCHAR" else f"TRY_CAST({col} AS {typ}) AS {col}"
+        for col, typ in RAW_COLUMNS[table].items()
+    ]
+    return "SELECT " + ", ".join(columns) + f" FROM {table}"
+
+
+def _build_pit_typed(con: duckdb.DuckDBPyConnection) -> None:
+    """Materialize the typed PIT counts with a year as a temp table.
+
+    Casts the counts and drops rows without a year once, for every COPY
+    that reads them.
+    """
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE pit_typed AS
+        {_select_raw("raw_pit_counts")}
+        WHERE year IS NOT NULL
+    """)
 
 
 def _export_processed(con: duckdb.DuckDBPyConnection) -> None:
@@ -67,23 +218,13 @@ def _export_processed(con: duckdb.DuckDBPyConnection) -> None:
     processed_path = PROCESSED_DIR / "pit_data.parquet"
     con.execute(f"""
         COPY (
-            SELECT
-                TRY_CAST(year AS INTEGER) AS year,
-                TRY_CAST(total_homeless AS INTEGER) AS total_homeless,
-                TRY_CAST(sheltered AS INTEGER) AS sheltered,
-                TRY_CAST(unsheltered AS INTEGER) AS unsheltered,
-                TRY_CAST(chronically_homeless AS INTEGER) AS chronically_homeless,
-                TRY_CAST(veterans AS INTEGER) AS veterans,
-                TRY_CAST(families_persons AS INTEGER) AS families_persons,
-                TRY_CAST(youth_under25 AS INTEGER) AS youth_under25,
-                TRY_CAST(first_time_homeless AS INTEGER) AS first_time_homeless
-            FROM raw_pit_counts
-            WHERE TRY_CAST(year AS INTEGER) IS NOT NULL
+            SELECT *
+            FROM pit_typed
             ORDER BY year
-        ) TO '{processed_path}' (FORMAT PARQUET, COMPRESSION ZSTD)
+        ) TO '{processed_path}' ({_COPY_OPTIONS})
     """)
     size_kb = processed_path.stat().st_size / 1024
-    print(f"  Exported processed data -> {processed_path} ({size_kb:.1f} KB)")
+    logger.info("  Exported processed data -> %s (%.1f KB)", processed_path, size_kb)
 
 
 def _build_aggregations(con: duckdb.DuckDBPyConnection) -> None:
@@ -93,71 +234,70 @@ def _build_aggregations(con: duckdb.DuckDBPyConnection) -> None:
     con.execute(f"""
         COPY (
             SELECT
-                TRY_CAST(year AS INTEGER) AS year,
-                TRY_CAST(total_homeless AS INTEGER) AS total,
-                TRY_CAST(sheltered AS INTEGER) AS sheltered,
-                TRY_CAST(unsheltered AS INTEGER) AS unsheltered
-            FROM raw_pit_counts
-            WHERE TRY_CAST(year AS INTEGER) IS NOT NULL
+                year,
+                total_homeless AS total,
+                sheltered,
+                unsheltered
+            FROM pit_typed
             ORDER BY year
-        ) TO '{AGGREGATED_DIR}/pit_trends.parquet' (FORMAT PARQUET, COMPRESSION ZSTD)
+        ) TO '{AGGREGATED_DIR}/pit_trends.parquet' ({_COPY_OPTIONS})
     """)
-    print("  [agg] pit_trends")
+    logger.info("  [agg] pit_trends")
 
     # 2) PIT subpopulations — demographic subgroups by year
     con.execute(f"""
         COPY (
-            SELECT
-                TRY_CAST(year AS INTEGER) AS year,
-                group_name,
-                TRY_CAST(count AS INTEGER) AS count
-            FROM raw_pit_subpopulations
-            WHERE TRY_CAST(year AS INTEGER) IS NOT NULL
-              AND TRY_CAST(count AS INTEGER) IS NOT NULL
+            SELECT * FROM ({_select_raw("raw_pit_subpopulations")})
+            WHERE year IS NOT NULL
+              AND count IS NOT NULL
             ORDER BY year, group_name
-        ) TO '{AGGREGATED_DIR}/pit_subpopulations.parquet' (FORMAT PARQUET, COMPRESSION ZSTD)
+        ) TO '{AGGREGATED_DIR}/pit_subpopulations.parquet' ({_COPY_OPTIONS})
     """)
-    print("  [agg] pit_subpopulations")
+    logger.info("  [agg] pit_subpopulations")
 
     # 3) PIT geography — subregional breakdowns
     con.execute(f"""
         COPY (
-            SELECT
-                TRY_CAST(year AS INTEGER) AS year,
-                region,
-                TRY_CAST(total AS INTEGER) AS total,
-                TRY_CAST(sheltered AS INTEGER) AS sheltered,
-                TRY_CAST(unsheltered AS INTEGER) AS unsheltered
-            FROM raw_pit_geography
-            WHERE TRY_CAST(year AS INTEGER) IS NOT NULL
+            {_select_raw("raw_pit_geography")}
+            WHERE year IS NOT NULL
             ORDER BY year, region
-        ) TO '{AGGREGATED_DIR}/pit_geography.parquet' (FORMAT PARQUET, COMPRESSION ZSTD)
+        ) TO '{AGGREGATED_DIR}/pit_geography.parquet' ({_COPY_OPTIONS})
     """)
-    print("  [agg] pit_geography")
+    logger.info("  [agg] pit_geography")
 
 
 def _build_spending_crossref(con: duckdb.DuckDBPyConnection) -> None:
     """Extract homelessness spending from the city budget project."""
     if not BUDGET_PARQUET.exists():
-        print("  [skip] homelessness_spending — budget parquet not found")
+        logger.info("  [skip] homelessness_spending — budget parquet not found")
         return
 
+    spending_sql = """
+        SELECT
+            fiscal_year,
+            SUM(amount) AS amount
+        FROM read_parquet(?)
+        WHERE dept_name = 'Homelessness Strategies & Solutions'
+          AND budget_cycle = 'adopted'
+          AND revenue_or_expense = 'Expense'
+          AND source = 'budget'
+        GROUP BY fiscal_year
+        ORDER BY fiscal_year
+    """
+    params = [str(BUDGET_PARQUET)]
+    if EXPLAIN:
+        # Shows the projected columns and the filters pushed into the scan
+        logger.info("%s", con.execute(f"EXPLAIN ANALYZE {spending_sql}", params).fetchone()[1])
     con.execute(f"""
-        COPY (
-            SELECT
-                fiscal_year,
-                SUM(amount) AS amount
-            FROM '{BUDGET_PARQUET}'
-            WHERE dept_name = 'Homelessness Strategies & Solutions'
-              AND budget_cycle = 'adopted'
-              AND revenue_or_expense = 'Expense'
-              AND source = 'budget'
-            GROUP BY fiscal_year
-            ORDER BY fiscal_year
-        ) TO '{AGGREGATED_DIR}/homelessness_spending.parquet' (FORMAT PARQUET, COMPRESSION ZSTD)
-    """)
-    print("  [agg] homelessness_spending")
+        COPY ({spending_sql}) TO '{AGGREGATED_DIR}/homelessness_spending.parquet' ({_COPY_OPTIONS})
+    """, params)
+    logger.info("  [agg] homelessness_spending")
 
 
 if __name__ == "__main__":
-    transform()
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build processed and aggregated parquets.")
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild every output even if its inputs are unchanged"
+    )
+    transform(force=parser.parse_args().force)
@@ -8,214 +8,336 @@ Usage:
 
 from __future__ import annotations
 
+import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import duckdb
+import pyarrow.parquet as pq
 
-AGG = Path(__file__).resolve().parent.parent / "data" / "aggregated"
-PROCESSED = Path(__file__).resolve().parent.parent / "data" / "processed"
-
-passed = 0
-failed = 0
-warnings = 0
-
+from pipeline._connect import configure
+from pipeline._files import file_size
 
-def _check(name: str, ok: bool, detail: str = "") -> None:
-    global passed, failed
-    if ok:
-        passed += 1
-        print(f"  PASS  {name}")
-    else:
-        failed += 1
-        msg = f"  FAIL  {name}"
-        if detail:
-            msg += f" — {detail}"
-        print(msg)
+logger = logging.getLogger(__name__)
 
+AGG = Path(__file__).resolve().parent.parent / "data" / "aggregated"
+PROCESSED = Path(__file__).resolve().parent.parent / "data" / "processed"
 
-def _warn(name: str, detail: str) -> None:
-    global warnings
-    warnings += 1
-    print(f"  WARN  {name} — {detail}")
+# Critical columns in pit_data.parquet whose NULL rate is checked
+NULL_RATE_COLUMNS = ["year", "total_homeless", "sheltered", "unsheltered"]
+
+
+@dataclass
+class Results:
+    """Pass/fail/warning tallies and report lines for one validate() run.
+
+    Lines are buffered and logged as one message by _summary().
+    """
+
+    passed: int = 0
+    failed: int = 0
+    warnings: int = 0
+    lines: list[str] = field(default_factory=list)
+
+    def section(self, title: str) -> None:
+        self.lines.append(f"\n-- {title} --")
+
+    def check(self, name: str, ok: bool, detail: str = "") -> None:
+        if ok:
+            self.passed += 1
+            self.lines.append(f"  PASS  {name}")
+        else:
+            self.failed += 1
+            msg = f"  FAIL  {name}"
+            if detail:
+                msg += f" — {detail}"
+            self.lines.append(msg)
+
+    def warn(self, name: str, detail: str) -> None:
+        self.warnings += 1
+        self.lines.append(f"  WARN  {name} — {detail}")
+
+
+def _footer_stats(path: Path) -> dict:
+    """Row count and per-column min/max/NULL count from a parquet footer.
+
+    Only the footer is read, no data pages. A column's min/max is None when
+    no row group has statistics for it (e.g. every value is NULL).
+    """
+    meta = pq.read_metadata(path)
+    columns = {}
+    for i in range(meta.num_columns):
+        chunks = [meta.row_group(rg).column(i).statistics for rg in range(meta.num_row_groups)]
+        with_range = [st for st in chunks if st is not None and st.has_min_max]
+        columns[meta.schema.column(i).name] = {
+            "min": min((st.min for st in with_range), default=None),
+            "max": max((st.max for st in with_range), default=None),
+            "nulls": sum(st.null_count for st in chunks if st is not None),
+        }
+    return {"rows": meta.num_rows, "columns": columns}
+
+
+def _fetchall(con: duckdb.DuckDBPyConnection, sql: str) -> list[tuple]:
+    """Run a query on its own cursor, so callers can run queries in parallel."""
+    with con.cursor() as cur:
+        return cur.execute(sql).fetchall()
+
+
+def _join_violations(
+    con: duckdb.DuckDBPyConnection,
+    with_subpop: bool,
+    with_geo: bool,
+) -> dict[str, list[tuple]]:
+    """Check subpopulations and regional sums against PIT totals in one query.
+
+    Reads the pit_trends view once for both checks. Returns violating rows by
+    kind: "subpop" rows are (year, group_name, count, total) and "geo" rows
+    are (year, geo_total, pit_total).
+    """
+    parts = []
+    if with_subpop:
+        # Subpopulation counts should be < total for same year
+        parts.append("""
+            SELECT 'subpop' AS kind, s.year, s.group_name AS label,
+                   s.count AS value, t.total
+            FROM pit_subpopulations s
+            JOIN t ON s.year = t.year
+            WHERE s.count > t.total
+        """)
+    if with_geo:
+        # Sum of regions ≈ total PIT for same year (within 10%)
+        parts.append("""
+            SELECT 'geo' AS kind, g.year, NULL AS label,
+                   SUM(g.total) AS value, t.total
+            FROM pit_geography g
+            JOIN t ON g.year = t.year
+            GROUP BY g.year, t.total
+            HAVING ABS(SUM(g.total) - t.total) > t.total * 0.10
+        """)
+    violations: dict[str, list[tuple]] = {"subpop": [], "geo": []}
+    if not parts:
+        return violations
+    rows = _fetchall(
+        con, "WITH t AS (SELECT year, total FROM pit_trends)\n" + "UNION ALL".join(parts)
+    )
+    for kind, year, label, value, total in rows:
+        if kind == "subpop":
+            violations["subpop"].append((year, label, value, total))
+        else:
+            violations["geo"].append((year, value, total))
+    return violations
 
 
 def validate() -> int:
     """Run all validation checks. Returns number of failures."""
-    con = duckdb.connect()
-
-    print("=" * 60)
-    print("Data Validation")
-    print("=" * 60)
+    results = Results()
+    results.lines += ["=" * 60, "Data Validation", "=" * 60]
 
-    # ── 1. File existence ──
-    print("\n-- File existence --")
     processed_path = PROCESSED / "pit_data.parquet"
-    _check("pit_data.parquet exists", processed_path.exists())
-
     expected_aggs = [
         "pit_trends",
         "pit_subpopulations",
         "pit_geography",
         "homelessness_spending",
     ]
-    for name in expected_aggs:
-        path = AGG / f"{name}.parquet"
-        _check(f"{name}.parquet exists", path.exists())
+    agg_paths = {name: AGG / f"{name}.parquet" for name in expected_aggs}
+    # Stat each output once; None means the file is missing
+    sizes = {path: file_size(path) for path in [processed_path, *agg_paths.values()]}
+
+    # ── 1. File existence ──
+    results.section("File existence")
+    results.check("pit_data.parquet exists", sizes[processed_path] is not None)
+    for name, path in agg_paths.items():
+        results.check(f"{name}.parquet exists", sizes[path] is not None)
+
+    # Nothing was written, so every later check would be skipped anyway
+    if all(size is None for size in sizes.values()):
+        return _summary(results)
+
+    # Row counts, year range and NULL counts for sections 2, 3 and 7
+    stats = {
+        name: _footer_stats(path)
+        for name, path in [("pit_data", processed_path), *agg_paths.items()]
+        if sizes[path] is not None
+    }
+
+    trends_path = agg_paths["pit_trends"]
+    subpop_path = agg_paths["pit_subpopulations"]
+    geo_path = agg_paths["pit_geography"]
+    spending_path = agg_paths["homelessness_spending"]
+    has_trends = sizes[trends_path] is not None
+
+    # The queries behind sections 3-6 are independent, so run them
+    # concurrently on separate cursors; the checks below then report them
+    # in section order. They read each output through a view named after
+    # the file.
+    queries = {}
+    if has_trends:
+        # sheltered + unsheltered more than 5% off total
+        queries["mismatch"] = """
+            SELECT year, total, sheltered + unsheltered AS computed_total,
+                   ABS(total - (sheltered + unsheltered)) AS diff
+            FROM pit_trends
+            WHERE total IS NOT NULL
+              AND sheltered IS NOT NULL
+              AND unsheltered IS NOT NULL
+              AND ABS(total - (sheltered + unsheltered)) > total * 0.05
+        """
+        queries["recent"] = """
+            SELECT year, total FROM pit_trends
+            WHERE year >= 2020
+            ORDER BY year
+        """
+    if sizes[subpop_path] is not None:
+        queries["groups"] = """
+            SELECT DISTINCT group_name FROM pit_subpopulations
+            ORDER BY group_name
+        """
+    if sizes[geo_path] is not None:
+        queries["regions"] = """
+            SELECT DISTINCT region FROM pit_geography
+            ORDER BY region
+        """
+    if sizes[spending_path] is not None:
+        queries["spending"] = """
+            SELECT fiscal_year, amount FROM homelessness_spending
+            ORDER BY fiscal_year
+        """
+    rows = {}
+    if queries:
+        with configure(duckdb.connect()) as con, ThreadPoolExecutor(max_workers=4) as pool:
+            # Keep parsed parquet footers between queries, so each file's
+            # metadata is read once however many checks query it
+            con.execute("SET GLOBAL parquet_metadata_cache = true")
+            for name, path in agg_paths.items():
+                if sizes[path] is not None:
+                    con.execute(f"CREATE VIEW {name} AS SELECT * FROM '{path}'")
+            futures = {key: pool.submit(_fetchall, con, sql) for key, sql in queries.items()}
+            if has_trends:
+                futures["violations"] = pool.submit(
+                    _join_violations,
+                    con,
+                    sizes[subpop_path] is not None,
+                    sizes[geo_path] is not None,
+                )
+            rows = {key: future.result() for key, future in futures.items()}
 
     # ── 2. Row counts (non-empty) ──
-    print("\n-- Row counts --")
+    results.section("Row counts")
     for name in expected_aggs:
-        path = AGG / f"{name}.parquet"
-        if not path.exists():
+        if name not in stats:
             continue
-        count = con.execute(f"SELECT count(*) FROM '{path}'").fetchone()[0]
-        _check(f"{name} has rows", count > 0, f"got {count:,} rows")
+        count = stats[name]["rows"]
+        results.check(f"{name} has rows", count > 0, f"got {count:,} rows")
 
     # ── 3. PIT trends integrity ──
-    print("\n-- PIT trends integrity --")
-    trends_path = AGG / "pit_trends.parquet"
-    if trends_path.exists():
+    results.section("PIT trends integrity")
+    if has_trends:
         # Check year range
-        yr_range = con.execute(f"""
-            SELECT MIN(year), MAX(year) FROM '{trends_path}'
-        """).fetchone()
-        min_yr, max_yr = yr_range
-        _check("Min year >= 2007", min_yr is not None and min_yr >= 2007, f"min={min_yr}")
-        _check("Max year >= 2023", max_yr is not None and max_yr >= 2023, f"max={max_yr}")
+        min_yr = stats["pit_trends"]["columns"]["year"]["min"]
+        max_yr = stats["pit_trends"]["columns"]["year"]["max"]
+        results.check("Min year >= 2007", min_yr is not None and min_yr >= 2007, f"min={min_yr}")
+        results.check("Max year >= 2023", max_yr is not None and max_yr >= 2023, f"max={max_yr}")
 
         # Check sheltered + unsheltered ≈ total (within 5% tolerance)
-        mismatch = con.execute(f"""
-            SELECT year, total, sheltered + unsheltered AS computed_total,
-                   ABS(total - (sheltered + unsheltered)) AS diff
-            FROM '{trends_path}'
-            WHERE total IS NOT NULL
-              AND sheltered IS NOT NULL
-              AND unsheltered IS NOT NULL
-              AND ABS(total - (sheltered + unsheltered)) > total * 0.05
-        """).fetchall()
-        _check(
+        mismatch = rows["mismatch"]
+        results.check(
             "sheltered + unsheltered ≈ total (within 5%)",
             len(mismatch) == 0,
             f"{len(mismatch)} years with mismatch: {mismatch}" if mismatch else "",
         )
 
         # Check recent years have reasonable counts (5K-20K for SD)
-        recent = con.execute(f"""
-            SELECT year, total FROM '{trends_path}'
-            WHERE year >= 2020
-            ORDER BY year
-        """).fetchall()
-        for yr, total in recent:
-            _check(
+        for yr, total in rows["recent"]:
+            results.check(
                 f"PIT {yr} total in range 5K-20K",
                 5000 < total < 20000,
                 f"got {total:,}",
             )
 
     # ── 4. Subpopulations ──
-    print("\n-- Subpopulations --")
-    subpop_path = AGG / "pit_subpopulations.parquet"
-    if subpop_path.exists():
-        groups = con.execute(f"""
-            SELECT DISTINCT group_name FROM '{subpop_path}'
-            ORDER BY group_name
-        """).fetchall()
-        group_list = [r[0] for r in groups]
-        _check("Has Chronically Homeless group", "Chronically Homeless" in group_list)
-        _check("Has Veterans group", "Veterans" in group_list)
-
-        # Subpopulation counts should be < total for same year
-        subpop_check = con.execute(f"""
-            SELECT s.year, s.group_name, s.count, t.total
-            FROM '{subpop_path}' s
-            JOIN '{trends_path}' t ON s.year = t.year
-            WHERE s.count > t.total
-        """).fetchall()
-        _check(
-            "Subpopulation counts < total PIT count",
-            len(subpop_check) == 0,
-            f"{len(subpop_check)} violations" if subpop_check else "",
-        )
+    results.section("Subpopulations")
+    if sizes[subpop_path] is not None:
+        group_list = [r[0] for r in rows["groups"]]
+        results.check("Has Chronically Homeless group", "Chronically Homeless" in group_list)
+        results.check("Has Veterans group", "Veterans" in group_list)
+
+        if has_trends:
+            subpop_check = rows["violations"]["subpop"]
+            results.check(
+                "Subpopulation counts < total PIT count",
+                len(subpop_check) == 0,
+                f"{len(subpop_check)} violations" if subpop_check else "",
+            )
 
     # ── 5. Geography ──
-    print("\n-- Geography --")
-    geo_path = AGG / "pit_geography.parquet"
-    if geo_path.exists():
-        regions = con.execute(f"""
-            SELECT DISTINCT region FROM '{geo_path}'
-            ORDER BY region
-        """).fetchall()
-        region_list = [r[0] for r in regions]
-        _check("Has City of San Diego region", "City of San Diego" in region_list,
+    results.section("Geography")
+    if sizes[geo_path] is not None:
+        region_list = [r[0] for r in rows["regions"]]
+        results.check("Has City of San Diego region", "City of San Diego" in region_list,
                f"regions: {region_list}")
 
-        # Sum of regions ≈ total PIT for same year (within 10%)
-        geo_totals = con.execute(f"""
-            SELECT g.year, SUM(g.total) AS geo_total, t.total AS pit_total
-            FROM '{geo_path}' g
-            JOIN '{trends_path}' t ON g.year = t.year
-            GROUP BY g.year, t.total
-            HAVING ABS(SUM(g.total) - t.total) > t.total * 0.10
-        """).fetchall()
-        _check(
-            "Geographic totals ≈ PIT total (within 10%)",
-            len(geo_totals) == 0,
-            f"{len(geo_totals)} year mismatches: {geo_totals}" if geo_totals else "",
-        )
+        if has_trends:
+            geo_totals = rows["violations"]["geo"]
+            results.check(
+                "Geographic totals ≈ PIT total (within 10%)",
+                len(geo_totals) == 0,
+                f"{len(geo_totals)} year mismatches: {geo_totals}" if geo_totals else "",
+            )
 
     # ── 6. Spending cross-reference ──
-    print("\n-- Spending cross-reference --")
-    spending_path = AGG / "homelessness_spending.parquet"
-    if spending_path.exists():
-        spending_fys = con.execute(f"""
-            SELECT fiscal_year, amount FROM '{spending_path}'
-            ORDER BY fiscal_year
-        """).fetchall()
-        _check("Spending has FY2021+", any(fy >= 2021 for fy, _ in spending_fys),
+    results.section("Spending cross-reference")
+    if sizes[spending_path] is not None:
+        spending_fys = rows["spending"]
+        results.check("Spending has FY2021+", any(fy >= 2021 for fy, _ in spending_fys),
                f"years: {[fy for fy, _ in spending_fys]}")
         for fy, amt in spending_fys:
-            _check(
+            results.check(
                 f"FY{fy} spending > $1M",
                 amt > 1_000_000,
                 f"${amt:,.0f}",
             )
 
     # ── 7. NULL rates on critical columns ──
-    print("\n-- NULL rates --")
-    if processed_path.exists():
-        total_rows = con.execute(f"SELECT count(*) FROM '{processed_path}'").fetchone()[0]
-        for col in ["year", "total_homeless", "sheltered", "unsheltered"]:
-            null_count = con.execute(f"""
-                SELECT count(*) FROM '{processed_path}' WHERE {col} IS NULL
-            """).fetchone()[0]
+    results.section("NULL rates")
+    if sizes[processed_path] is not None:
+        total_rows = stats["pit_data"]["rows"]
+        for col in NULL_RATE_COLUMNS:
+            null_count = stats["pit_data"]["columns"][col]["nulls"]
             pct = (null_count / total_rows * 100) if total_rows > 0 else 0
             if pct > 10:
-                _warn(f"{col} NULL rate", f"{pct:.1f}% ({null_count:,}/{total_rows:,})")
+                results.warn(f"{col} NULL rate", f"{pct:.1f}% ({null_count:,}/{total_rows:,})")
             else:
-                _check(f"{col} NULL rate < 10%", True, f"{pct:.1f}%")
+                results.check(f"{col} NULL rate < 10%", True, f"{pct:.1f}%")
 
     # ── 8. File sizes ──
-    print("\n-- File sizes --")
-    proc_size = processed_path.stat().st_size / 1024 if processed_path.exists() else 0
-    _check("pit_data.parquet < 1MB", proc_size < 1024, f"{proc_size:.1f}KB")
+    results.section("File sizes")
+    proc_size = (sizes[processed_path] or 0) / 1024
+    results.check("pit_data.parquet < 1MB", proc_size < 1024, f"{proc_size:.1f}KB")
 
-    total_agg = sum(
-        (AGG / f"{n}.parquet").stat().st_size for n in expected_aggs
-        if (AGG / f"{n}.parquet").exists()
-    ) / 1024
-    _check("Total aggregated < 1MB", total_agg < 1024, f"{total_agg:.1f}KB")
+    total_agg = sum(sizes[path] or 0 for path in agg_paths.values()) / 1024
+    results.check("Total aggregated < 1MB", total_agg < 1024, f"{total_agg:.1f}KB")
 
-    # ── Summary ──
-    con.close()
-    print("\n" + "=" * 60)
-    print(f"Results: {passed} passed, {failed} failed, {warnings} warnings")
-    print("=" * 60)
+    return _summary(results)
+
+
+def _summary(results: Results) -> int:
+    """Log the buffered report with its totals line; return the failure count."""
+    results.lines += [
+        "\n" + "=" * 60,
+        f"Results: {results.passed} passed, {results.failed} failed, "
+        f"{results.warnings} warnings",
+        "=" * 60,
+    ]
+    logger.info("\n".join(results.lines))
 
-    return failed
+    return results.failed
 
 
 def main() -> None:
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.INFO)
     failures = validate()
     sys.exit(1 if failures > 0 else 0)
 